@@ -1,53 +1,318 @@
-import json
+import aiohttp
+import asyncio
 import gradio as gr
+import hashlib
+import io
+import json
+import openai
+import os
+import re
 import requests
-import subprocess
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, Dict
-
+from typing import Optional
+
+import tiktoken
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+from nougat import NougatModel
+from nougat.dataset.rasterize import rasterize_paper
+from nougat.postprocessing import markdown_compatible
+from nougat.utils.checkpoint import get_checkpoint
+from nougat.utils.dataset import LazyDataset
+
+# Optional ONNX Runtime fast path for the OCR model (fp16 tensor cores via
+# TensorRT when available). Falls back to the PyTorch model when optimum is
+# not installed.
+try:
+    from optimum.onnxruntime import ORTModelForVision2Seq
+    from transformers import NougatProcessor
+except ImportError:
+    ORTModelForVision2Seq = None
+    NougatProcessor = None
+
+import langchain
 from langchain.prompts import ChatPromptTemplate
 from langchain.chat_models import ChatOpenAI
 from langchain.docstore.base import Document
 from langchain.text_splitter import MarkdownHeaderTextSplitter
 
-CHAT_MODEL = ChatOpenAI(model="gpt-3.5-turbo-16k")
+# Optional semantic cache: near-duplicate prompts (re-running a paper, shared
+# boilerplate sections) return the prior completion instead of a new LLM call.
+try:
+    from gptcache import Cache
+    from gptcache.adapter.api import init_similar_cache
+    from langchain.cache import GPTCache
+except ImportError:
+    GPTCache = None
+
+# Short sections go to the cheaper/faster 4k-context model; only inputs that
+# actually need the room pay 16k pricing
+CHAT_MODEL_4K = ChatOpenAI(model="gpt-3.5-turbo", streaming=True, request_timeout=60)
+CHAT_MODEL_16K = ChatOpenAI(
+    model="gpt-3.5-turbo-16k", streaming=True, request_timeout=60
+)
+
+TOKEN_ENCODING = tiktoken.encoding_for_model("gpt-3.5-turbo")
+# prompt + completion must fit the 4k context, so leave headroom
+MODEL_4K_TOKEN_LIMIT = 3_000
+
+
+def init_gptcache(cache_obj: "Cache", llm: str) -> None:
+    # onnx embedding + sqlite/faiss store, keyed on the formatted prompt
+    # string. llm is langchain's full serialized params string, far too long
+    # and shell-hostile for a path component, so hash it first
+    hashed_llm = hashlib.sha256(llm.encode("utf-8")).hexdigest()
+    init_similar_cache(cache_obj=cache_obj, data_dir=f"cache/gptcache/{hashed_llm}")
+
+
+if GPTCache is not None:
+    langchain.llm_cache = GPTCache(init_gptcache)
+
+NOUGAT_MODEL_TAG = "0.1.0-base"
+NOUGAT_BATCH_SIZE = 8
+
+MAX_CONCURRENT_SECTIONS = 8
+# push at most one streamed update to the UI per interval
+YIELD_INTERVAL_SECONDS = 0.1
+
+# Snippet budget per reduce call; anything larger is synthesized in parallel
+# intermediate passes first (roughly 3k tokens of snippets)
+REDUCE_CHUNK_CHARS = 12_000
+
+BATCH_POLL_SECONDS = 30
+
+# Math delimiter rewrite for gradio markdown support, done in a single regex
+# pass instead of four full-document str.replace copies
+_MATH_RE = re.compile(r"\\\(|\\\)|\\\[|\\\]")
+_MATH_MAP = {r"\(": "$", r"\)": "$", r"\[": "$$", r"\]": "$$"}
+
+# Shared session so repeat downloads reuse the TCP+TLS connection to arxiv
+SESSION = requests.Session()
+SESSION.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+)
+
+_WARMUP_POOL = ThreadPoolExecutor(max_workers=1)
+
+# The pinned openai 0.28 SDK speaks requests/aiohttp rather than httpx, so
+# connection reuse is configured by handing it pooled sessions; without this
+# every small section call pays its own TLS handshake and TCP slow-start
+OPENAI_SESSION = requests.Session()
+OPENAI_SESSION.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+)
+openai.requestssession = OPENAI_SESSION
+
+_OPENAI_AIOSESSION: Optional[aiohttp.ClientSession] = None
+
+
+async def ensure_openai_aiosession() -> None:
+    # the shared async session must be created inside the running event loop,
+    # so the async generators call this before their first LLM call
+    global _OPENAI_AIOSESSION
+    if _OPENAI_AIOSESSION is None:
+        _OPENAI_AIOSESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        )
+    openai.aiosession.set(_OPENAI_AIOSESSION)
+
+
+ONNX_OCR_MODEL_ID = "pszemraj/nougat-small-onnx"
+# TensorRT builds an engine on first run; cache it on disk so only the first
+# run pays the build cost
+ONNX_TRT_CACHE_DIR = "cache/trt"
+
+# Content-addressed OCR cache: same PDF bytes -> same .mmd, so resubmitting a
+# paper skips the ~5 min OCR step entirely
+OCR_CACHE_DIR = Path("cache/ocr")
+
+# sha256 per downloaded path, computed while the download streams so the OCR
+# cache lookup never has to read the PDF back from disk
+_PDF_HASHES: dict = {}
+
+# Loaded lazily and kept as a module global so every OCR call (and every Gradio
+# worker in the same process) reuses the weights instead of reloading them
+_NOUGAT_MODEL: Optional[NougatModel] = None
+_ONNX_OCR = None
+
+
+def get_nougat_model() -> NougatModel:
+    global _NOUGAT_MODEL
+    if _NOUGAT_MODEL is None:
+        model = NougatModel.from_pretrained(get_checkpoint(model_tag=NOUGAT_MODEL_TAG))
+        if torch.cuda.is_available():
+            # half precision on GPU, same as the nougat CLI default
+            model = model.to("cuda").to(torch.bfloat16)
+        model.eval()
+        _NOUGAT_MODEL = model
+    return _NOUGAT_MODEL
 
 
 def download_pdf_from_url(pdf_link: str) -> str:
     # Generate a unique filename
     unique_filename = f"input/downloaded_paper_{uuid.uuid4().hex}.pdf"
 
-    # Send a GET request to the PDF link
-    response = requests.get(pdf_link)
+    # Send a GET request to the PDF link, streaming the body to disk so the
+    # whole PDF is never buffered in memory
+    with SESSION.get(pdf_link, stream=True, timeout=30) as response:
+        if response.status_code == 200:
+            with open(unique_filename, "wb") as pdf_file:
+                fd = pdf_file.fileno()
+                # reserve the full file up front to avoid fragmentation
+                content_length = int(response.headers.get("Content-Length", "0"))
+                if content_length > 0:
+                    os.posix_fallocate(fd, 0, content_length)
+                hasher = hashlib.sha256()
+                while True:
+                    chunk = response.raw.read(1 << 20)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    pdf_file.write(chunk)
+                _PDF_HASHES[unique_filename] = hasher.hexdigest()
+                pdf_file.flush()
+                # the hash was taken from the stream above, so userspace only
+                # touches this file again if OCR misses the cache; let the
+                # kernel drop the freshly written pages from the page cache
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            print("PDF downloaded successfully.")
+        else:
+            print("Failed to download the PDF.")
+    return unique_filename
+
 
-    if response.status_code == 200:
-        # Save the PDF content to a local file
-        with open(unique_filename, "wb") as pdf_file:
-            pdf_file.write(response.content)
-        print("PDF downloaded successfully.")
+def get_onnx_ocr():
+    global _ONNX_OCR
+    if _ONNX_OCR is None:
+        processor = NougatProcessor.from_pretrained(ONNX_OCR_MODEL_ID)
+        Path(ONNX_TRT_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        try:
+            model = ORTModelForVision2Seq.from_pretrained(
+                ONNX_OCR_MODEL_ID,
+                provider="TensorrtExecutionProvider",
+                provider_options={
+                    "trt_fp16_enable": True,
+                    "trt_engine_cache_enable": True,
+                    "trt_engine_cache_path": ONNX_TRT_CACHE_DIR,
+                },
+                use_io_binding=True,
+            )
+        except Exception:
+            # no TensorRT on this machine, plain CUDA provider is still fp16
+            model = ORTModelForVision2Seq.from_pretrained(
+                ONNX_OCR_MODEL_ID,
+                provider="CUDAExecutionProvider",
+                use_io_binding=True,
+            )
+        _ONNX_OCR = (model, processor)
+    return _ONNX_OCR
+
+
+def nougat_ocr_onnx(file_path: Path) -> str:
+    model, processor = get_onnx_ocr()
+    pages = [
+        Image.open(page).convert("RGB")
+        for page in rasterize_paper(file_path, return_pil=True)
+    ]
+    predictions = []
+    for i in range(0, len(pages), NOUGAT_BATCH_SIZE):
+        batch = processor(images=pages[i : i + NOUGAT_BATCH_SIZE], return_tensors="pt")
+        outputs = model.generate(batch.pixel_values)
+        for text in processor.batch_decode(outputs, skip_special_tokens=True):
+            predictions.append(markdown_compatible(text))
+    return "".join(predictions)
+
+
+def nougat_ocr_torch(file_path: Path) -> str:
+    model = get_nougat_model()
+    dataset = LazyDataset(
+        str(file_path), partial(model.encoder.prepare_input, random_padding=False)
+    )
+    dataloader = DataLoader(
+        dataset,
+        batch_size=NOUGAT_BATCH_SIZE,
+        shuffle=False,
+        collate_fn=LazyDataset.ignore_none_collate,
+    )
+
+    predictions = []
+    for sample, _is_last_page in dataloader:
+        model_output = model.inference(image_tensors=sample, early_stopping=True)
+        for output in model_output["predictions"]:
+            predictions.append(markdown_compatible(output))
+    return "".join(predictions)
+
+
+def warm_ocr_model() -> None:
+    # Touching the model triggers CUDA context init + weight upload, work that
+    # can hide behind the PDF download
+    if ORTModelForVision2Seq is not None:
+        get_onnx_ocr()
     else:
-        print("Failed to download the PDF.")
-    return unique_filename
+        get_nougat_model()
+
+
+@lru_cache(maxsize=32)
+def read_cached_mmd(content_hash: str) -> str:
+    return (OCR_CACHE_DIR / f"{content_hash}.mmd").read_text(encoding="utf-8")
+
+
+def warm() -> None:
+    # Pay model load, CUDA context init, and the OpenAI TLS handshake at app
+    # startup instead of on the first user click
+    warm_ocr_model()
+    if ORTModelForVision2Seq is None and torch.cuda.is_available():
+        model = get_nougat_model()
+        try:
+            # a dummy encoder forward compiles the CUDA kernels up front
+            dummy_page = torch.zeros(
+                (1, 3, *model.config.input_size),
+                device=model.device,
+                dtype=next(model.parameters()).dtype,
+            )
+            with torch.no_grad():
+                model.encoder(dummy_page)
+        except Exception:
+            pass
+    try:
+        # tiny probe completion warms the pooled HTTP connection to OpenAI
+        CHAT_MODEL_4K.predict("ping")
+    except Exception:
+        # no API key at startup is fine; the first real call will connect
+        pass
 
 
 def nougat_ocr(file_path: Path) -> None:
     assert file_path.exists(), f"File {file_path} does not exist"
-    # unique_filename = f"/content/output/downloaded_paper_{uuid.uuid4().hex}.pdf"
     # Runs nougat OCR on the file and saves the output to the output folder as a .mmd file
-    cli_command = [
-        "nougat",
-        "--out",
-        "output",
-        "pdf",
-        f"{str(file_path)}",
-        "--markdown",
-    ]
-
-    # Run the command and capture its output
-    subprocess.run(
-        cli_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
+    # the download path already hashed the bytes while streaming; only hash
+    # here for files that arrived some other way
+    content_hash = _PDF_HASHES.pop(str(file_path), None)
+    if content_hash is None:
+        content_hash = hashlib.sha256(file_path.read_bytes()).hexdigest()
+    cache_path = OCR_CACHE_DIR / f"{content_hash}.mmd"
+    if cache_path.exists():
+        text = read_cached_mmd(content_hash)
+    else:
+        if ORTModelForVision2Seq is not None:
+            text = nougat_ocr_onnx(file_path)
+        else:
+            text = nougat_ocr_torch(file_path)
+        # write the cache entry atomically so a crash never leaves a partial
+        # .mmd behind; the tmp name is unique per writer so two concurrent
+        # submissions of the same PDF can't clobber each other mid-write
+        OCR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = OCR_CACHE_DIR / f"{content_hash}.{uuid.uuid4().hex}.tmp"
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+
+    output_path = Path("output") / f"{file_path.stem}.mmd"
+    output_path.write_text(text, encoding="utf-8")
     return
 
 
@@ -63,6 +328,8 @@ def pdf_to_mmd(
     # Create the input/output folder if it does not exist
     Path("input").mkdir(parents=True, exist_ok=True)
     Path("output").mkdir(parents=True, exist_ok=True)
+    # Start loading the OCR model while the download does network IO
+    warmup = _WARMUP_POOL.submit(warm_ocr_model)
     # Either download the pdf file from the link or use the uploaded pdf file
     if pdf_file is None:
         progress(0.0, desc="Downloading PDF file from the link")
@@ -81,6 +348,7 @@ def pdf_to_mmd(
     progress(
         0.3, desc="Running Nougat OCR on the PDF file - This may take a while (~5 mins)"
     )
+    warmup.result()
     nougat_ocr(file_path)
 
     progress(0.9, desc="Loading Markdown file")
@@ -89,92 +357,277 @@ def pdf_to_mmd(
     with open(markdown_path, "r") as file:
         content = file.read()
     # switch math delimiters for gradio markdown support
-    content = (
-        content.replace(r"\(", "$")
-        .replace(r"\)", "$")
-        .replace(r"\[", "$$")
-        .replace(r"\]", "$$")
-    )
+    content = _MATH_RE.sub(lambda m: _MATH_MAP[m.group(0)], content)
     return content
 
 
-def create_individual_summmary_chain() -> None:
-    prompt_template = """You are being given a markdown document with headers, this is part of a larger arxiv paper. Your task is to write a summary of the document.
+# static instructions first, dynamic variables last, so provider-side
+# prompt caching can reuse the shared prefix across every section call
+INDIVIDUAL_PROMPT_TEMPLATE = """You are being given a markdown document with headers, this is part of a larger arxiv paper. Your task is to write a summary of the document.
+    For the summary provide it in the format of a bullet point list consisting of at minimum 2 bullet points and at most 5.
+    It should also be in markdown format
+
+    INPUT:
     here are the headers of this particlar section of the paper:
     "{headers}"
     and here is the content of the section:
     "{page_content}"
-    For the summary provide it in the format of a bullet point list consisting of at minimum 2 bullet points and at most 5.
-    It should also be in markdown format
     SUMMARY:"""
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    individual_summary_chain = prompt | CHAT_MODEL
+
+
+def create_individual_summmary_chain(chat_model: ChatOpenAI) -> None:
+    prompt = ChatPromptTemplate.from_template(INDIVIDUAL_PROMPT_TEMPLATE)
+    individual_summary_chain = prompt | chat_model
     return individual_summary_chain
 
 
-def create_final_summmary_chain() -> None:
+def create_final_summmary_chain(chat_model: ChatOpenAI) -> None:
+    # same ordering rule as the individual chain: instructions up front, the
+    # snippets at the tail
     prompt_template = """You are presented with a collection of text snippets. Each snippet is a summary of a specific section from an academic paper published on arXiv. Your objective is to synthesize these snippets into a coherent, concise summary of the entire paper.
 
-    DOCUMENT SNIPPETS:
-    "{docs}"
-
     INSTRUCTIONS: Craft a concise summary below, capturing the essence of the paper based on the provided snippets.
     It is also important that you highlight the key contributions of the paper, and 3 key takeaways from the paper.
     Lastly you should provide a list of 5 questions that you would ask the author of the paper if you had the chance.
+
+    DOCUMENT SNIPPETS:
+    "{docs}"
+
     SUMMARY:
     """
     final_summary_prompt = ChatPromptTemplate.from_template(prompt_template)
-    final_summary_chain = final_summary_prompt | CHAT_MODEL
+    final_summary_chain = final_summary_prompt | chat_model
 
     return final_summary_chain
 
 
-def generate_individual_summary(parsed_output: str) -> str:
-    headers_to_split_on = [
+# Built once at import so per-request calls skip template parsing and chain
+# construction
+INDIVIDUAL_CHAIN_4K = create_individual_summmary_chain(CHAT_MODEL_4K)
+INDIVIDUAL_CHAIN_16K = create_individual_summmary_chain(CHAT_MODEL_16K)
+FINAL_CHAIN_4K = create_final_summmary_chain(CHAT_MODEL_4K)
+FINAL_CHAIN_16K = create_final_summmary_chain(CHAT_MODEL_16K)
+
+
+def pick_chain(text: str, chain_4k, chain_16k):
+    # route by input length: under the 4k budget -> cheaper model
+    if len(TOKEN_ENCODING.encode(text)) < MODEL_4K_TOKEN_LIMIT:
+        return chain_4k
+    return chain_16k
+
+
+MD_SPLITTER = MarkdownHeaderTextSplitter(
+    headers_to_split_on=[
         ("#", "Header 1"),
         ("##", "Header 2"),
         ("###", "Header 3"),
     ]
+)
+
+
+def format_header_label(split) -> str:
+    # plain "key: value" label; JSON escaping only inflated prompt tokens
+    return " / ".join(f"{k}: {v}" for k, v in split.metadata.items())
+
+
+def format_header_markdown(split) -> str:
+    header_to_append = ""
+    for key in split.metadata.keys():
+        if key == "Header 3":
+            header_to_append = f"\n### {split.metadata[key]}\n"
+        elif key == "Header 2":
+            header_to_append = f"\n## {split.metadata[key]}\n"
+        elif key == "Header 1":
+            header_to_append = f"\n# {split.metadata[key]}\n"
+    return header_to_append
+
+
+async def summarize_sections_via_batch(md_header_splits) -> list:
+    # One OpenAI Batch API job for all sections: half the price of the
+    # synchronous endpoint, results whenever the batch completes (<=24h).
+    # The pinned openai 0.28 SDK predates /v1/batches, so the three endpoints
+    # are called as plain REST over the shared aiohttp session
+    await ensure_openai_aiosession()
+    session = _OPENAI_AIOSESSION
+    base_url = openai.api_base.rstrip("/")
+    headers = {"Authorization": f"Bearer {openai.api_key}"}
+
+    lines = []
+    for i, split in enumerate(md_header_splits):
+        prompt_text = INDIVIDUAL_PROMPT_TEMPLATE.format(
+            headers=format_header_label(split), page_content=split.page_content
+        )
+        if len(TOKEN_ENCODING.encode(split.page_content)) < MODEL_4K_TOKEN_LIMIT:
+            model = "gpt-3.5-turbo"
+        else:
+            model = "gpt-3.5-turbo-16k"
+        lines.append(
+            json.dumps(
+                {
+                    "custom_id": str(i),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": [{"role": "user", "content": prompt_text}],
+                    },
+                }
+            )
+        )
 
-    markdown_splitter = MarkdownHeaderTextSplitter(
-        headers_to_split_on=headers_to_split_on
+    # the Batch API requires a .jsonl-named upload
+    form = aiohttp.FormData()
+    form.add_field("purpose", "batch")
+    form.add_field(
+        "file",
+        "\n".join(lines).encode("utf-8"),
+        filename="sections.jsonl",
+        content_type="application/jsonl",
     )
-    md_header_splits = markdown_splitter.split_text(parsed_output)
+    async with session.post(
+        f"{base_url}/files", headers=headers, data=form
+    ) as response:
+        response.raise_for_status()
+        input_file = await response.json()
+
+    async with session.post(
+        f"{base_url}/batches",
+        headers=headers,
+        json={
+            "input_file_id": input_file["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+        },
+    ) as response:
+        response.raise_for_status()
+        batch = await response.json()
+
+    while batch["status"] in ("validating", "in_progress", "finalizing"):
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        async with session.get(
+            f"{base_url}/batches/{batch['id']}", headers=headers
+        ) as response:
+            response.raise_for_status()
+            batch = await response.json()
+    if batch["status"] != "completed":
+        raise gr.Error(f"Batch job ended with status '{batch['status']}'")
+
+    async with session.get(
+        f"{base_url}/files/{batch['output_file_id']}/content", headers=headers
+    ) as response:
+        response.raise_for_status()
+        output_text = await response.text()
+
+    results = {}
+    for line in output_text.splitlines():
+        obj = json.loads(line)
+        results[int(obj["custom_id"])] = obj["response"]["body"]["choices"][0][
+            "message"
+        ]["content"]
+    return [results.get(i, "") for i in range(len(md_header_splits))]
+
+
+async def generate_individual_summary(
+    parsed_output: str, batch_mode: bool = False
+) -> str:
+    await ensure_openai_aiosession()
+    md_header_splits = MD_SPLITTER.split_text(parsed_output)
+
+    if batch_mode:
+        section_summaries = await summarize_sections_via_batch(md_header_splits)
+        buf = io.StringIO()
+        for split, section_summary in zip(md_header_splits, section_summaries):
+            buf.write(format_header_markdown(split))
+            buf.write(section_summary)
+        yield buf.getvalue()
+        return
+
+    # Summarize all sections concurrently (the OpenAI round trips overlap) and
+    # yield them back in document order as each one finishes
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SECTIONS)
+
+    async def summarize_section(split) -> str:
+        chain = pick_chain(
+            split.page_content, INDIVIDUAL_CHAIN_4K, INDIVIDUAL_CHAIN_16K
+        )
+        async with semaphore:
+            result = await chain.ainvoke(
+                {
+                    "headers": format_header_label(split),
+                    "page_content": split.page_content,
+                }
+            )
+        return result.content
 
-    individual_summary_chain = create_individual_summmary_chain()
+    tasks = [
+        asyncio.create_task(summarize_section(split)) for split in md_header_splits
+    ]
 
+    # accumulate in a StringIO (geometric growth) instead of rebinding an
+    # ever-growing str, which copies the whole summary on every append
     summary_docs = []
-    summary = ""
-    for split in md_header_splits:
-        current_header: Dict[str, str] = json.dumps(split.metadata)
-        current_page_content: str = split.page_content
-
-        header_to_append = ""
-        for key in split.metadata.keys():
-            if key == "Header 3":
-                header_to_append = f"\n### {split.metadata[key]}\n"
-            elif key == "Header 2":
-                header_to_append = f"\n## {split.metadata[key]}\n"
-            elif key == "Header 1":
-                header_to_append = f"\n# {split.metadata[key]}\n"
-
-        summary += header_to_append
-        for s in individual_summary_chain.stream(
-            {"headers": current_header, "page_content": current_page_content}
-        ):
-            summary += s.content
-            yield summary
-
-        doc = Document(page_content=current_page_content, metadata=split.metadata)
-        summary_docs.append(doc)
-
-
-def generate_final_summary(individual_summaries: str) -> str:
-    final_summary_chain = create_final_summmary_chain()
-    final_summary = ""
-    for s in final_summary_chain.stream({"docs": individual_summaries}):
-        final_summary += s.content
-        yield final_summary
+    buf = io.StringIO()
+    try:
+        for split, task in zip(md_header_splits, tasks):
+            buf.write(format_header_markdown(split))
+            buf.write(await task)
+            yield buf.getvalue()
+
+            doc = Document(page_content=split.page_content, metadata=split.metadata)
+            summary_docs.append(doc)
+    finally:
+        # if a section failed (or the client disconnected), stop the in-flight
+        # calls instead of letting them run on and log unretrieved exceptions
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def split_for_reduce(text: str, max_chars: int = REDUCE_CHUNK_CHARS) -> list:
+    # Split the snippet collection at line boundaries into chunks that each
+    # fit one reduce call
+    chunks = []
+    current = []
+    current_size = 0
+    for line in text.splitlines(keepends=True):
+        if current and current_size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current = []
+            current_size = 0
+        current.append(line)
+        current_size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+async def generate_final_summary(individual_summaries: str) -> str:
+    # Map-reduce: when the snippets exceed one call's budget, synthesize
+    # chunks of them in parallel and reduce the intermediate syntheses until
+    # a single chunk remains, then stream the final reduce to the UI
+    await ensure_openai_aiosession()
+    chunks = split_for_reduce(individual_summaries) or [individual_summaries]
+    while len(chunks) > 1:
+        chain = pick_chain(max(chunks, key=len), FINAL_CHAIN_4K, FINAL_CHAIN_16K)
+        results = await chain.abatch(
+            [{"docs": chunk} for chunk in chunks],
+            config={"max_concurrency": MAX_CONCURRENT_SECTIONS},
+        )
+        reduced = "\n\n".join(r.content for r in results)
+        # same fallback as the initial split: empty reduce output must not
+        # leave chunks empty
+        chunks = split_for_reduce(reduced) or [reduced]
+
+    final_chain = pick_chain(chunks[0], FINAL_CHAIN_4K, FINAL_CHAIN_16K)
+    buf = io.StringIO()
+    last_yield = time.monotonic()
+    async for s in final_chain.astream({"docs": chunks[0]}):
+        buf.write(s.content)
+        now = time.monotonic()
+        if now - last_yield >= YIELD_INTERVAL_SECONDS:
+            yield buf.getvalue()
+            last_yield = now
+    yield buf.getvalue()
 
 
 def main() -> None:
@@ -206,6 +659,11 @@ def main() -> None:
         with gr.Row():
             btn = gr.Button("Run NOUGAT🍫")
             clr = gr.Button("Clear🚿")
+        with gr.Row():
+            batch_mode = gr.Checkbox(
+                label="Batch mode (50% cheaper summaries, may take up to 24h)",
+                value=False,
+            )
 
         with gr.Row():
             gr.Markdown(
@@ -229,7 +687,7 @@ def main() -> None:
             outputs=parsed_output,
         ).success(
             fn=generate_individual_summary,
-            inputs=[parsed_output],
+            inputs=[parsed_output, batch_mode],
             outputs=individual_summary,
         ).success(
             fn=generate_final_summary,
@@ -255,7 +713,12 @@ def main() -> None:
             label="Click on any Examples below to get Nougat OCR results quickly:",
         )
 
-    demo.queue()
+    # warm in the background so the UI comes up immediately
+    _WARMUP_POOL.submit(warm)
+
+    # more than one worker, since a batch-mode summary can hold its queue
+    # slot until the batch completes (up to 24h)
+    demo.queue(concurrency_count=4)
     demo.launch(debug=True)
 
 